@@ -1,35 +1,97 @@
+from functools import lru_cache
 import hashlib
 
 
+def _digest_blake2b(data: bytes) -> bytes:
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+def _digest_sha256(data: bytes) -> bytes:
+    return hashlib.sha256(data).digest()
+
+
+# Each digest provides at least 16 bytes: two 64-bit hashes for double hashing
+DIGEST_FUNCTIONS = {
+    "blake2b": _digest_blake2b,
+    "sha256": _digest_sha256,
+}
+
+
+# Bits per block: one 64-byte cache line holds all k bits of an item
+BLOCK_BITS = 512
+
+
+def _num_blocks(size: int) -> int:
+    return (size + BLOCK_BITS - 1) // BLOCK_BITS
+
+
+@lru_cache
+def _build_hashes(size: int, k: int, hash_name: str):
+    """Generate a hash function specialized for one (size, k, hash_name)."""
+    # First 8 bytes pick the block, the next 8 bytes are split into two
+    # 32-bit hashes for double hashing within it (Kirsch-Mitzenmacher).
+    # Block count and k are baked in as constants, one expression per index.
+    indices = ", ".join(
+        f"base + ((h1 + {i} * h2) & {BLOCK_BITS - 1})" for i in range(k)
+    )
+    source = (
+        "def _hashes(item):\n"
+        "    d = digest(item.encode())\n"
+        f"    base = from_bytes(d[:8], 'little') % {_num_blocks(size)} * {BLOCK_BITS}\n"
+        "    h1 = from_bytes(d[8:12], 'little')\n"
+        "    h2 = from_bytes(d[12:16], 'little') | 1\n"  # odd step: distinct positions
+        f"    return ({indices},)\n"
+    )
+    namespace = {"digest": DIGEST_FUNCTIONS[hash_name], "from_bytes": int.from_bytes}
+    exec(source, namespace)
+    # Shared by filters with the same parameters: repeated items skip hashing
+    return lru_cache(maxsize=8192)(namespace["_hashes"])
+
+
 class BloomFilter:
     """Simple Bloom filter implementation."""
 
-    def __init__(self, size: int, num_hashes: int):
+    def __init__(self, size: int, num_hashes: int, hash_name: str = "blake2b"):
         """
         Initialize the Bloom filter with a given size and number of hash functions.
+
+        hash_name selects the digest the k indices are derived from:
+        'blake2b' (default) or 'sha256'. Either way one digest is computed per item.
         """
         if size <= 0 or num_hashes <= 0:
             raise ValueError("size and num_hashes must be positive")
+        if hash_name not in DIGEST_FUNCTIONS:
+            raise ValueError(f"Unknown hash function: {hash_name}")
         self.size = size
         self.num_hashes = num_hashes
-        # Use bytearray for memory efficiency (8 bits per byte)
-        self.bit_array = bytearray((size + 7) // 8)
+        self.hash_name = hash_name
+        # Use bytearray for memory efficiency (8 bits per byte), rounded up
+        # to whole blocks so each item touches a single cache line
+        self.bit_array = bytearray(_num_blocks(size) * BLOCK_BITS // 8)
+        # 64-bit word view over the same memory for single-word addressing
+        self._words = memoryview(self.bit_array).cast("Q")
+        # Deterministic bit indices of an item, all inside one block
+        self._hashes = _build_hashes(size, num_hashes, hash_name)
+
+    def __getstate__(self) -> dict:
+        # The word view and generated hash function cannot be pickled;
+        # both are rebuilt from the bit array and parameters on load
+        state = self.__dict__.copy()
+        del state["_words"], state["_hashes"]
+        return state
 
-    def _hashes(self, item: str) -> list[int]:
-        """Generate deterministic hash values using SHA256."""
-        hashes = []
-        for i in range(self.num_hashes):
-            h = hashlib.sha256(f"{item}{i}".encode()).hexdigest()
-            hashes.append(int(h, 16) % self.size)
-        return hashes
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._words = memoryview(self.bit_array).cast("Q")
+        self._hashes = _build_hashes(self.size, self.num_hashes, self.hash_name)
 
     def _set_bit(self, index: int) -> None:
         # Set the bit at 'index' to 1
-        self.bit_array[index // 8] |= 1 << (index % 8)
+        self._words[index >> 6] |= 1 << (index & 63)
 
     def _get_bit(self, index: int) -> bool:
         # Check if the bit at 'index' is set
-        return bool(self.bit_array[index // 8] & (1 << (index % 8)))
+        return bool(self._words[index >> 6] & (1 << (index & 63)))
 
     def add(self, item: str) -> None:
         """Add an item to the Bloom filter."""
@@ -40,44 +102,72 @@ class BloomFilter:
         """Check if an item might be in the Bloom filter."""
         return all(self._get_bit(h) for h in self._hashes(item))
 
+    def add_many(self, items: list[str]) -> None:
+        """Add several items to the Bloom filter in one pass."""
+        words = self._words
+        hashes = self._hashes
+        for item in items:
+            for index in hashes(item):
+                words[index >> 6] |= 1 << (index & 63)
+
+    def check_many(self, items: list[str]) -> list[bool]:
+        """Check several items at once, returning one flag per item."""
+        words = self._words
+        hashes = self._hashes
+        results = []
+        append = results.append
+        for item in items:
+            for index in hashes(item):
+                if not words[index >> 6] & (1 << (index & 63)):
+                    append(False)
+                    break
+            else:
+                append(True)
+        return results
+
     def _count_bits_set(self) -> int:
         """Count the number of bits set to 1."""
-        count = 0
-        for byte in self.bit_array:
-            count += bin(byte).count("1")
-        return count
+        # Single popcount over the whole array instead of a per-byte loop
+        return int.from_bytes(self.bit_array, "little").bit_count()
 
     def _false_positive_rate(self, n: int) -> float:
         """Calculate false positive rate for n elements."""
         if n == 0:
             return 0.0
-        # Formula: (1 - e^(-k*n/m))^k
+        # Blocked layout: items per block follow Poisson(n / blocks), and a
+        # block holding i items has the classic rate (1 - (1 - 1/B)^(k*i))^k
         import math
 
         k = self.num_hashes
-        m = self.size
-        return (1 - math.exp(-k * n / m)) ** k
+        blocks = len(self.bit_array) * 8 // BLOCK_BITS
+        lam = n / blocks
+        spread = 10 * math.sqrt(lam) + 10
+        rate = 0.0
+        for i in range(max(0, int(lam - spread)), int(lam + spread) + 1):
+            weight = math.exp(i * math.log(lam) - lam - math.lgamma(i + 1))
+            rate += weight * (1 - (1 - 1 / BLOCK_BITS) ** (k * i)) ** k
+        return rate
 
     def __repr__(self) -> str:
         bits_set = self._count_bits_set()
         bloom_length = len(self.bit_array)
+        # Bits actually allocated: size rounded up to whole blocks
+        m = bloom_length * 8
         # Estimate elements added based on bits set
         import math
 
         if bits_set == 0:
             estimated_added = 0
-        elif bits_set >= self.size:
-            estimated_added = self.size
+        elif bits_set >= m:
+            estimated_added = m
         else:
-            estimated_added = int(
-                -self.size / self.num_hashes * math.log(1 - bits_set / self.size)
-            )
+            estimated_added = int(-m / self.num_hashes * math.log(1 - bits_set / m))
 
         current_fpr = self._false_positive_rate(estimated_added)
 
         return (
             f"BloomFilter:\n"
-            f"\tbits: {self.size}\n"
+            f"\tbits: {m} (requested {self.size})\n"
             f"\tnumber hashes: {self.num_hashes}\n"
             f"\tbloom length (8 bits): {bloom_length}\n"
             f"\tnumber bits set: {bits_set}\n"
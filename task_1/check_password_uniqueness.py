@@ -10,13 +10,18 @@ def check_password_uniqueness(
     bloom_filter: BloomFilter, passwords: list
 ) -> dict[str, str]:
     results = {}
+    valid = []
     for password in passwords:
         if not isinstance(password, str) or password == "":
             results[password] = NOT_VALID
-        elif bloom_filter.check(password):
-            results[password] = ALREADY_USED
         else:
+            # Reserve the slot so results keep the input order
             results[password] = UNIQUE
+            valid.append(password)
+
+    for password, used in zip(valid, bloom_filter.check_many(valid)):
+        if used:
+            results[password] = ALREADY_USED
     return results
 
 
@@ -27,8 +32,7 @@ if __name__ == "__main__":
 
     # Adding existing passwords
     existing_passwords = ["password123", "admin123", "qwerty123"]
-    for password in existing_passwords:
-        bloom.add(password)
+    bloom.add_many(existing_passwords)
 
     print("Bloom filter initialized.", bloom, "\n")
 
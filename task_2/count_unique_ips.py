@@ -1,21 +1,95 @@
 import time
 from pathlib import Path
 import argparse
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 import hashlib
-import json
 import math
+import mmap
+import re
+import shutil
+import socket
 from pathlib import Path
 from urllib.parse import urlparse
 from urllib.request import urlopen
 
+try:
+    import orjson as _json
+except ImportError:  # optional speed-up, fall back to stdlib json
+    import json as _json
+
+try:
+    from pyroaring import BitMap
+except ImportError:  # optional compact IPv4 set, fall back to set[int]
+    BitMap = None
+
+try:
+    import xxhash
+except ImportError:  # optional speed-up, fall back to stdlib BLAKE2b
+    xxhash = None
+
+
+def _hash64_sha256(data: bytes) -> int:
+    # Low 64 bits of the SHA-256 value, same bits the original add() used
+    return int.from_bytes(hashlib.sha256(data).digest()[-8:], "big")
+
+
+def _hash64_blake2b(data: bytes) -> int:
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little")
+
+
+HASH_FUNCTIONS = {
+    "fast": xxhash.xxh3_64_intdigest if xxhash is not None else _hash64_blake2b,
+    "sha256": _hash64_sha256,
+}
+
+
+@lru_cache
+def _build_slot(precision: int, hash_name: str):
+    """Return a cached item -> (bucket index, rank) function for one sketch shape."""
+    hash_fn = HASH_FUNCTIONS[hash_name]
+    q = 64 - precision  # bits left for the rank
+    mask = (1 << precision) - 1
+    rank_mask = (1 << q) - 1
+
+    # Access logs repeat IPs a lot, so repeated items skip hashing
+    @lru_cache(maxsize=8192)
+    def slot(item: bytes) -> tuple[int, int]:
+        hash_value = hash_fn(item)
+        # Leading zeros of the remaining q bits (q when they are all zero)
+        remaining_bits = (hash_value >> precision) & rank_mask
+        return hash_value & mask, q - remaining_bits.bit_length() + 1
+
+    return slot
+
+
+# 2 ** -rank for every possible register value (ranks never exceed 61)
+_POW2_NEG = tuple(2.0**-i for i in range(70))
+
+# Approximate memory per distinct IPv4 key: a set[int] pays for an int object
+# (28 bytes) plus a hash-table slot (~32 bytes at typical load); a roaring
+# BitMap stores 2 bytes per key in array containers
+SET_BYTES_PER_IP = 60
+BITMAP_BYTES_PER_IP = 2
+
+# Number of IPs collected before they are handed to HyperLogLog.add_many
+HLL_BATCH_SIZE = 100_000
+
+# Block size for downloading a log into the cache
+DOWNLOAD_CHUNK_SIZE = 1 << 20
+
+# The "remote_addr" field of a flat JSON-lines access log record; a match
+# never crosses a newline, so a truncated line cannot swallow the next one
+REMOTE_ADDR_PATTERN = re.compile(rb'"remote_addr"[ \t]*:[ \t]*"([^"\n]*)"')
+
 
 def is_url(value: str | Path) -> bool:
     parsed = urlparse(str(value))
     return parsed.scheme in {"https"}
 
 
-def open_log_source(log_source: str | Path):
-    """Yield lines from a local file or HTTP(S) URL."""
+def resolve_log_path(log_source: str | Path) -> Path:
+    """Return a local path for the log, downloading and caching URLs."""
     if is_url(log_source):
         # Create .cache directory if it doesn't exist
         cache_dir = Path(".cache")
@@ -31,26 +105,93 @@ def open_log_source(log_source: str | Path):
             response = urlopen(str(log_source))
             try:
                 with cache_file.open("wb") as f:
-                    f.write(response.read())
+                    shutil.copyfileobj(response, f, DOWNLOAD_CHUNK_SIZE)
             finally:
                 response.close()
         else:
             print(f"Using cached file: {cache_file}")
 
-        # Read from cached file
-        with cache_file.open("r", encoding="utf-8") as file_handle:
-            for raw in file_handle:
-                yield raw
-    else:
-        with Path(log_source).open("r", encoding="utf-8") as file_handle:
-            for raw in file_handle:
-                yield raw
+        return cache_file
+    return Path(log_source)
+
+
+def open_log_source(log_source: str | Path):
+    """Yield the log (a local file or cached URL) as one read-only mmap."""
+    path = resolve_log_path(log_source)
+    if path.stat().st_size == 0:
+        return  # empty files cannot be mapped
+    # The kernel pages the file in on demand; the regex scans it in place
+    with path.open("rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        yield mm
+
+
+def split_log_ranges(path: Path, parts: int) -> list[tuple[int, int]]:
+    """Split a file into up to `parts` byte ranges aligned to line boundaries."""
+    size = path.stat().st_size
+    if size == 0:
+        return []
+
+    bounds = [0]
+    with path.open("rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for i in range(1, parts):
+            newline = mm.find(b"\n", max(size * i // parts, bounds[-1]))
+            if newline == -1:
+                break
+            bounds.append(newline + 1)
+    bounds.append(size)
+    return [(start, end) for start, end in zip(bounds, bounds[1:]) if start < end]
+
+
+def iter_ips(buffer, start: int = 0, end: int | None = None):
+    """Yield non-empty "remote_addr" values (as bytes) from a JSON-lines buffer."""
+    # Scans buffer[start:end] in place; an mmap is never copied
+    end = len(buffer) if end is None else end
+    for match in REMOTE_ADDR_PATTERN.finditer(buffer, start, end):
+        ip = match.group(1).strip()
+        if ip:
+            yield ip
+
+
+def iter_ips_json(buffer, start: int = 0, end: int | None = None):
+    """Yield non-empty "remote_addr" values by fully parsing each JSON line."""
+    # Slices one line at a time, so memory stays bounded by the longest line
+    loads = _json.loads
+    find = buffer.find
+    end = len(buffer) if end is None else end
+    pos = start
+    while pos < end:
+        newline = find(b"\n", pos, end)
+        if newline == -1:
+            newline = end
+        ip = _remote_addr(loads, buffer[pos:newline])
+        if ip:
+            yield ip
+        pos = newline + 1
+
+
+def _remote_addr(loads, line: bytes) -> bytes | None:
+    if not line.strip():
+        return None
+    try:
+        record = loads(line)
+    except ValueError:
+        return None
+    ip = record.get("remote_addr") if isinstance(record, dict) else None
+    if isinstance(ip, str):
+        return ip.strip().encode()
+    return None
+
+
+IP_PARSERS = {
+    "regex": iter_ips,
+    "json": iter_ips_json,
+}
 
 
 class HyperLogLog:
     """HyperLogLog algorithm for approximate cardinality estimation."""
 
-    def __init__(self, precision: int = 5):
+    def __init__(self, precision: int = 5, hash_name: str = "fast"):
         """
         Initialize HyperLogLog with given precision.
 
@@ -58,14 +199,26 @@ class HyperLogLog:
             precision: Number of bits to use for bucket indexing (4-16).
                       Higher precision = more accuracy but more memory.
                       Default 5 gives ~32 buckets with ~26.3% standard error.
+            hash_name: 64-bit hash to use: 'fast' (xxh3 when the xxhash
+                      package is installed, BLAKE2b otherwise) or 'sha256'
+                      for results reproducible with earlier versions.
         """
         if not 4 <= precision <= 16:
             raise ValueError("Precision must be between 4 and 16")
+        if hash_name not in HASH_FUNCTIONS:
+            raise ValueError(f"Unknown hash function: {hash_name}")
 
         self.precision = precision
+        self.hash_name = hash_name
         # 2^precision buckets
         self.m = 1 << precision
-        self.registers = [0] * self.m
+        # One byte per register: ranks never exceed 64 - precision + 1
+        self.registers = bytearray(self.m)
+        # Running harmonic sum (2 ** -0 per register) and empty-register count
+        self._z = float(self.m)
+        self._zeros = self.m
+        # Maps an item to its (bucket index, rank)
+        self._slot = _build_slot(precision, hash_name)
 
         # Alpha constant for bias correction
         if self.m >= 128:
@@ -79,43 +232,72 @@ class HyperLogLog:
         else:
             self.alpha = 0.5
 
-    def add(self, item: str) -> None:
+    def add(self, item: str | bytes) -> None:
         """Add an item to the HyperLogLog."""
-        # Hash the item using SHA-256
-        hash_value = int(hashlib.sha256(item.encode()).hexdigest(), 16)
-
-        # Use first 'precision' bits for bucket index
-        bucket_index = hash_value & (self.m - 1)
-
-        # Use remaining bits to find leading zeros
-        remaining_bits = hash_value >> self.precision
-        leading_zeros = self._count_leading_zeros(remaining_bits) + 1
+        bucket_index, leading_zeros = self._slot(
+            item if isinstance(item, bytes) else item.encode()
+        )
 
         # Update register with maximum leading zeros count
-        self.registers[bucket_index] = max(self.registers[bucket_index], leading_zeros)
-
-    def _count_leading_zeros(self, bits: int) -> int:
-        """Count the number of leading zero bits."""
-        if bits == 0:
-            return 64 - self.precision  # Maximum possible
-
-        count = 0
-        # Check each bit from left to right
-        for i in range(64 - self.precision - 1, -1, -1):
-            if bits & (1 << i):
-                break
-            count += 1
-        return count
+        old = self.registers[bucket_index]
+        if leading_zeros > old:
+            self._z += _POW2_NEG[leading_zeros] - _POW2_NEG[old]
+            if old == 0:
+                self._zeros -= 1
+            self.registers[bucket_index] = leading_zeros
+
+    def add_many(self, items: list[str | bytes]) -> None:
+        """Add a batch of items to the HyperLogLog."""
+        registers = self.registers
+        slot = self._slot
+        z = self._z
+        zeros = self._zeros
+        try:
+            for item in items:
+                bucket_index, leading_zeros = slot(
+                    item if isinstance(item, bytes) else item.encode()
+                )
+                old = registers[bucket_index]
+                if leading_zeros > old:
+                    z += _POW2_NEG[leading_zeros] - _POW2_NEG[old]
+                    if old == 0:
+                        zeros -= 1
+                    registers[bucket_index] = leading_zeros
+        finally:
+            # Keep the running sums in step with registers already updated
+            self._z = z
+            self._zeros = zeros
+
+    def merge(self, other: "HyperLogLog") -> None:
+        """Merge another HyperLogLog with the same precision and hash function."""
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLog with a different precision")
+        if other.hash_name != self.hash_name:
+            raise ValueError("Cannot merge HyperLogLog with a different hash function")
+        # Union of two sketches is the elementwise maximum of their registers
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        self._z = math.fsum(_POW2_NEG[rank] for rank in self.registers)
+        self._zeros = self.registers.count(0)
+
+    def __getstate__(self) -> dict:
+        # The cached slot function cannot be pickled; it is rebuilt on load
+        state = self.__dict__.copy()
+        del state["_slot"]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._slot = _build_slot(self.precision, self.hash_name)
 
     def count(self) -> int:
         """Estimate the cardinality."""
-        # Calculate raw estimate
-        raw_estimate = self.alpha * (self.m**2) / sum(2 ** (-x) for x in self.registers)
+        # Calculate raw estimate from the sum maintained by add()
+        raw_estimate = self.alpha * (self.m**2) / self._z
 
         # Apply bias correction for small and large ranges
         if raw_estimate <= 2.5 * self.m:
             # Small range correction
-            zeros = self.registers.count(0)
+            zeros = self._zeros
             if zeros != 0:
                 return int(self.m * math.log(self.m / zeros))
 
@@ -127,59 +309,126 @@ class HyperLogLog:
             return int(-1 * (1 << 32) * math.log(1 - raw_estimate / (1 << 32)))
 
 
-def count_unique_ips_set(log_path: str | Path) -> int:
-    """Count unique IP addresses in a JSON-lines access log using a set."""
-    unique_ips: set[str] = set()
-
-    for line_number, raw_line in enumerate(open_log_source(log_path), start=1):
-        line = raw_line.strip()
-        if not line:
-            continue
+def _collect_ips(ips) -> tuple[set[int], set[bytes]]:
+    # IPv4 addresses are packed into 32-bit ints; anything else is kept as is
+    ipv4_keys = BitMap() if BitMap is not None else set()
+    other_ips: set[bytes] = set()
+    inet_pton = socket.inet_pton
+    from_bytes = int.from_bytes
 
+    for ip in ips:
         try:
-            record = json.loads(line)
-        except json.JSONDecodeError:
-            continue
+            ipv4_keys.add(from_bytes(inet_pton(socket.AF_INET, ip.decode("ascii"))))
+        except (OSError, ValueError):
+            other_ips.add(ip)
 
-        ip = record.get("remote_addr")
-        if isinstance(ip, str):
-            stripped_ip = ip.strip()
-            if stripped_ip:
-                unique_ips.add(stripped_ip)
+    return ipv4_keys, other_ips
 
-    return len(unique_ips)
 
+def _add_ips(hll: HyperLogLog, ips) -> None:
+    batch: list[bytes] = []
+    for ip in ips:
+        batch.append(ip)
+        if len(batch) >= HLL_BATCH_SIZE:
+            hll.add_many(batch)
+            batch.clear()
+    hll.add_many(batch)
 
-def count_unique_ips_hyperloglog(log_path: str | Path, precision: int = 14) -> int:
-    """Count unique IP addresses using HyperLogLog approximate algorithm."""
-    hll = HyperLogLog(precision=precision)
 
-    for line_number, raw_line in enumerate(open_log_source(log_path), start=1):
-        line = raw_line.strip()
-        if not line:
-            continue
+def _iter_source_ips(log_path: str | Path, parser: str):
+    for buffer in open_log_source(log_path):
+        yield from IP_PARSERS[parser](buffer)
 
-        try:
-            record = json.loads(line)
-        except json.JSONDecodeError:
-            continue
 
-        ip = record.get("remote_addr")
-        if isinstance(ip, str):
-            stripped_ip = ip.strip()
-            if stripped_ip:
-                hll.add(stripped_ip)
+def _iter_range_ips(path: Path, start: int, end: int, parser: str):
+    # Each worker maps the file and scans only its range, without copying it
+    with path.open("rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        yield from IP_PARSERS[parser](mm, start, end)
+
+
+def _set_worker(path: Path, start: int, end: int, parser: str):
+    return _collect_ips(_iter_range_ips(path, start, end, parser))
+
+
+def _hyperloglog_worker(
+    path: Path, start: int, end: int, precision: int, hash_name: str, parser: str
+) -> HyperLogLog:
+    hll = HyperLogLog(precision=precision, hash_name=hash_name)
+    _add_ips(hll, _iter_range_ips(path, start, end, parser))
+    return hll
+
+
+def _run_parallel(worker, log_path: str | Path, workers: int, *args) -> list:
+    """Run `worker` over line-aligned byte ranges of the log in separate processes."""
+    path = resolve_log_path(log_path)
+    ranges = split_log_ranges(path, workers)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(worker, path, start, end, *args) for start, end in ranges
+        ]
+        return [future.result() for future in futures]
+
+
+def count_unique_ips_set(
+    log_path: str | Path, parser: str = "regex", workers: int = 1
+) -> int:
+    """Count unique IP addresses in a JSON-lines access log using a set."""
+    if workers < 1:
+        raise ValueError("workers must be positive")
+    if workers > 1:
+        ipv4_keys = BitMap() if BitMap is not None else set()
+        other_ips: set[bytes] = set()
+        for part_keys, part_others in _run_parallel(
+            _set_worker, log_path, workers, parser
+        ):
+            ipv4_keys |= part_keys
+            other_ips |= part_others
+    else:
+        ipv4_keys, other_ips = _collect_ips(
+            _iter_source_ips(log_path, parser)
+        )
+
+    return len(ipv4_keys) + len(other_ips)
+
+
+def count_unique_ips_hyperloglog(
+    log_path: str | Path,
+    precision: int = 14,
+    hash_name: str = "fast",
+    parser: str = "regex",
+    workers: int = 1,
+) -> int:
+    """Count unique IP addresses using HyperLogLog approximate algorithm."""
+    if workers < 1:
+        raise ValueError("workers must be positive")
+    hll = HyperLogLog(precision=precision, hash_name=hash_name)
+
+    if workers > 1:
+        for part in _run_parallel(
+            _hyperloglog_worker, log_path, workers, precision, hash_name, parser
+        ):
+            hll.merge(part)
+    else:
+        _add_ips(hll, _iter_source_ips(log_path, parser))
 
     return hll.count()
 
 
-def compare_methods(log_path: str | Path, precision: int = 14) -> None:
+def compare_methods(
+    log_path: str | Path,
+    precision: int = 14,
+    hash_name: str = "fast",
+    parser: str = "regex",
+    workers: int = 1,
+) -> None:
     start_time = time.time()
-    set_count = count_unique_ips_set(log_path)
+    set_count = count_unique_ips_set(log_path, parser, workers)
     set_time = time.time() - start_time
 
     start_time = time.time()
-    hll_count = count_unique_ips_hyperloglog(log_path, precision)
+    hll_count = count_unique_ips_hyperloglog(
+        log_path, precision, hash_name, parser, workers
+    )
     hll_time = time.time() - start_time
 
     print(f"Set method: {set_count} unique IPs in {set_time:.6f} seconds")
@@ -193,6 +442,13 @@ def compare_methods(log_path: str | Path, precision: int = 14) -> None:
     print(f"{'Execution Time (sec)':<25} {set_time:>15.2f} {hll_time:>15.2f}")
 
 
+def positive_int(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be a positive integer: {value}")
+    return number
+
+
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(
         description="Count unique IP addresses using set and HyperLogLog."
@@ -215,6 +471,26 @@ def parse_args() -> argparse.Namespace:
         default=5,
         help="HyperLogLog precision (4-16). Default: 5. Higher = more accuracy but more memory.",
     )
+    parser.add_argument(
+        "--hash",
+        type=str,
+        choices=sorted(HASH_FUNCTIONS),
+        default="fast",
+        help="HyperLogLog hash function: 'fast' (xxh3 or BLAKE2b, default) or 'sha256'.",
+    )
+    parser.add_argument(
+        "--parser",
+        type=str,
+        choices=sorted(IP_PARSERS),
+        default="regex",
+        help="How to extract remote_addr: 'regex' scan (default) or full 'json' parsing.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=positive_int,
+        default=1,
+        help="Number of processes that scan parts of the log in parallel. Default: 1.",
+    )
     return parser.parse_args()
 
 
@@ -238,7 +514,9 @@ def main() -> None:
         print("=" * 50)
         print("Exact counting using set:")
         print("=" * 50)
-        exact_count = count_unique_ips_set(log_source)
+        exact_count = count_unique_ips_set(
+            log_source, parser=args.parser, workers=args.workers
+        )
         print(f"Unique IP addresses (exact): {exact_count}")
         print()
 
@@ -247,7 +525,11 @@ def main() -> None:
         print(f"Approximate counting using HyperLogLog (precision={args.precision}):")
         print("=" * 50)
         approximate_count = count_unique_ips_hyperloglog(
-            log_source, precision=args.precision
+            log_source,
+            precision=args.precision,
+            hash_name=args.hash,
+            parser=args.parser,
+            workers=args.workers,
         )
         print(f"Unique IP addresses (HyperLogLog): {approximate_count}")
 
@@ -264,8 +546,10 @@ def main() -> None:
             print(f"Error rate:         {error_rate:.2f}%")
 
             # Memory estimation
-            # Set: each IP is roughly 15 bytes (average IPv4 string) + overhead
-            set_memory = exact_count * 64  # Rough estimate with Python overhead
+            # Set: IPv4 addresses are stored as packed 32-bit keys
+            set_memory = exact_count * (
+                BITMAP_BYTES_PER_IP if BitMap is not None else SET_BYTES_PER_IP
+            )
             # HyperLogLog: precision determines number of registers
             hll_memory = (1 << args.precision) * 1  # 1 byte per register
             memory_ratio = set_memory / hll_memory if hll_memory > 0 else 0
@@ -276,7 +560,13 @@ def main() -> None:
             print(f"HyperLogLog:        ~{hll_memory:,} bytes")
             print(f"Memory reduction:   {memory_ratio:.1f}x")
 
-            compare_methods(log_source, precision=args.precision)
+            compare_methods(
+                log_source,
+                precision=args.precision,
+                hash_name=args.hash,
+                parser=args.parser,
+                workers=args.workers,
+            )
 
         print()
 
@@ -0,0 +1,64 @@
+import copy
+import pickle
+import unittest
+
+from task_1.bloom_filter import DIGEST_FUNCTIONS, BloomFilter
+
+
+def make_items(prefix: str, count: int) -> list[str]:
+    return [f"{prefix}-{i}" for i in range(count)]
+
+
+class BloomFilterTest(unittest.TestCase):
+    def test_no_false_negatives(self):
+        for hash_name in DIGEST_FUNCTIONS:
+            with self.subTest(hash_name=hash_name):
+                bloom = BloomFilter(size=5000, num_hashes=4, hash_name=hash_name)
+                items = make_items("password", 500)
+                for item in items:
+                    bloom.add(item)
+                self.assertTrue(all(bloom.check(item) for item in items))
+
+    def test_batch_methods_match_single_item_methods(self):
+        added = make_items("added", 300)
+        probes = added + make_items("probe", 300)
+        for hash_name in DIGEST_FUNCTIONS:
+            with self.subTest(hash_name=hash_name):
+                single = BloomFilter(size=3000, num_hashes=5, hash_name=hash_name)
+                batch = BloomFilter(size=3000, num_hashes=5, hash_name=hash_name)
+                for item in added:
+                    single.add(item)
+                batch.add_many(added)
+
+                self.assertEqual(single.bit_array, batch.bit_array)
+                self.assertEqual(
+                    batch.check_many(probes), [single.check(p) for p in probes]
+                )
+
+    def test_copies_are_independent(self):
+        bloom = BloomFilter(size=2000, num_hashes=3, hash_name="sha256")
+        bloom.add_many(["alpha", "beta"])
+        for copied in (pickle.loads(pickle.dumps(bloom)), copy.deepcopy(bloom)):
+            with self.subTest(copy=type(copied).__name__):
+                self.assertEqual(copied.bit_array, bloom.bit_array)
+                self.assertEqual(copied.check_many(["alpha", "beta"]), [True, True])
+
+                copied.add("gamma")
+                self.assertTrue(copied.check("gamma"))
+                self.assertFalse(bloom.check("gamma"))
+                self.assertNotEqual(copied.bit_array, bloom.bit_array)
+
+    def test_false_positive_rate_tracks_blocked_layout(self):
+        bloom = BloomFilter(size=100_000, num_hashes=5)
+        bloom.add_many(make_items("added", 10_000))
+        probes = make_items("probe", 50_000)
+        measured = sum(bloom.check_many(probes)) / len(probes)
+
+        estimate = bloom._false_positive_rate(10_000)
+        self.assertAlmostEqual(estimate, measured, delta=0.1 * measured)
+        # The allocated size is reported, rounded up to whole 512-bit blocks
+        self.assertIn("bits: 100352 (requested 100000)", repr(bloom))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,141 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from task_2.count_unique_ips import (
+    HyperLogLog,
+    count_unique_ips_hyperloglog,
+    count_unique_ips_set,
+    split_log_ranges,
+)
+
+
+def write_log(directory: str, ips: list[str], trailing_newline: bool = True) -> Path:
+    path = Path(directory) / "access.log"
+    lines = [f'{{"timestamp": "t{i}", "remote_addr": "{ip}"}}' for i, ip in enumerate(ips)]
+    path.write_text("\n".join(lines) + ("\n" if trailing_newline else ""))
+    return path
+
+
+class HyperLogLogMergeTest(unittest.TestCase):
+    def test_merge_matches_single_sketch(self):
+        items = [f"10.0.{i // 256}.{i % 256}" for i in range(5000)]
+        whole = HyperLogLog(precision=10)
+        whole.add_many(items)
+        left = HyperLogLog(precision=10)
+        left.add_many(items[:2500])
+        right = HyperLogLog(precision=10)
+        right.add_many(items[2500:])
+
+        left.merge(right)
+
+        self.assertEqual(left.registers, whole.registers)
+        self.assertEqual(left.count(), whole.count())
+
+    def test_merge_rejects_different_precision(self):
+        with self.assertRaises(ValueError):
+            HyperLogLog(precision=10).merge(HyperLogLog(precision=8))
+
+    def test_merge_rejects_different_hash(self):
+        with self.assertRaises(ValueError):
+            HyperLogLog(hash_name="fast").merge(HyperLogLog(hash_name="sha256"))
+
+
+class HyperLogLogSha256Test(unittest.TestCase):
+    """hash_name="sha256" must reproduce the original SHA-256 implementation."""
+
+    # (precision, item, bucket, rank) computed with the original add()
+    KNOWN_SLOTS = [
+        (4, "80.211.38.60", 7, 1),
+        (4, "80.211.38.61", 8, 2),
+        (4, "10.0.0.1", 13, 3),
+        (14, "80.211.38.60", 15639, 1),
+        (14, "80.211.38.61", 12152, 2),
+        (14, "10.0.0.1", 14861, 3),
+    ]
+
+    def test_known_bucket_and_rank(self):
+        for precision, item, bucket, rank in self.KNOWN_SLOTS:
+            with self.subTest(precision=precision, item=item):
+                hll = HyperLogLog(precision=precision, hash_name="sha256")
+                hll.add(item)
+                expected = bytearray(hll.m)
+                expected[bucket] = rank
+                self.assertEqual(hll.registers, expected)
+
+    def test_known_count(self):
+        hll = HyperLogLog(precision=10, hash_name="sha256")
+        hll.add_many([f"10.0.{i // 256}.{i % 256}" for i in range(3000)])
+        self.assertEqual(hll.count(), 3009)
+
+
+class SplitLogRangesTest(unittest.TestCase):
+    def assert_line_aligned(self, path: Path, ranges: list[tuple[int, int]]):
+        data = path.read_bytes()
+        self.assertEqual(ranges[0][0], 0)
+        self.assertEqual(ranges[-1][1], len(data))
+        for (_, end), (start, _) in zip(ranges, ranges[1:]):
+            self.assertEqual(end, start)
+            self.assertEqual(data[start - 1 : start], b"\n")
+
+    def test_no_trailing_newline(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = write_log(directory, ["1.1.1.1", "2.2.2.2", "3.3.3.3"], False)
+            ranges = split_log_ranges(path, 3)
+            self.assert_line_aligned(path, ranges)
+
+    def test_more_parts_than_lines(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = write_log(directory, ["1.1.1.1", "2.2.2.2"])
+            ranges = split_log_ranges(path, 16)
+            self.assertLessEqual(len(ranges), 2)
+            self.assert_line_aligned(path, ranges)
+
+    def test_empty_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = write_log(directory, [], False)
+            self.assertEqual(split_log_ranges(path, 4), [])
+
+
+class ParserTest(unittest.TestCase):
+    def test_regex_matches_json_on_truncated_line(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "access.log"
+            path.write_text(
+                '{"timestamp": "t0", "remote_addr": "1.1.1.1\n'
+                '{"timestamp": "t1", "remote_addr": "2.2.2.2"}\n'
+                '{"timestamp": "t2", "remote_addr": "3.3.3.3"}\n'
+            )
+            self.assertEqual(count_unique_ips_set(path, "regex"), 2)
+            self.assertEqual(count_unique_ips_set(path, "json"), 2)
+
+
+class ParallelCountTest(unittest.TestCase):
+    def test_workers_match_single_process(self):
+        ips = [f"192.168.{i % 7}.{i % 251}" for i in range(3000)] + ["::1", "bad"]
+        with tempfile.TemporaryDirectory() as directory:
+            path = write_log(directory, ips, False)
+            for parser in ("regex", "json"):
+                with self.subTest(parser=parser):
+                    self.assertEqual(
+                        count_unique_ips_set(path, parser, workers=3),
+                        count_unique_ips_set(path, parser, workers=1),
+                    )
+                    self.assertEqual(
+                        count_unique_ips_hyperloglog(path, 10, parser=parser, workers=3),
+                        count_unique_ips_hyperloglog(path, 10, parser=parser, workers=1),
+                    )
+
+    def test_rejects_non_positive_workers(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = write_log(directory, ["1.1.1.1"])
+            for workers in (0, -1):
+                with self.subTest(workers=workers):
+                    with self.assertRaises(ValueError):
+                        count_unique_ips_set(path, workers=workers)
+                    with self.assertRaises(ValueError):
+                        count_unique_ips_hyperloglog(path, workers=workers)
+
+
+if __name__ == "__main__":
+    unittest.main()